@@ -3,7 +3,8 @@ import io
 import os.path
 import pkgutil
 from collections import namedtuple
-from itertools import groupby
+from functools import lru_cache
+from operator import attrgetter, itemgetter
 
 import pyte.graphics
 import pyte.screens
@@ -19,11 +20,25 @@ _BRIGHTCOLORS = ['bright{}'.format(color) for color in _COLORS]
 NAMED_COLORS = _COLORS + _BRIGHTCOLORS
 pyte.graphics.FG_BG_256 = NAMED_COLORS + pyte.graphics.FG_BG_256[16:]
 
+# CSS class of each named color: 'black' -> 'color0', ..., 'brightwhite' -> 'color15'
+_NAMED_COLOR_CLASSES = {name: 'color{}'.format(index)
+                        for index, name in enumerate(NAMED_COLORS)}
+
+# CSS class of the text color of a cell given its named color and boldness:
+# bold text is displayed using the bright variant of the color
+_TEXT_COLOR_CLASSES = {
+    (name, bold): _NAMED_COLOR_CLASSES[
+        'bright{}'.format(name) if bold and not name.startswith('bright') else name
+    ]
+    for name in NAMED_COLORS
+    for bold in (False, True)
+}
+
 # Id for the very last SVG animation. This is used to make the first animations
 # start when the last one ends (animation looping)
 LAST_ANIMATION_ID = 'anim_last'
 
-# Background rectangle SVG element
+# Attributes of the background rectangle SVG element
 _BG_RECT_TAG_ATTRIBUTES = {
     'class': 'background',
     'height': '100%',
@@ -31,7 +46,6 @@ _BG_RECT_TAG_ATTRIBUTES = {
     'x': '0',
     'y': '0'
 }
-BG_RECT_TAG = etree.Element('rect', _BG_RECT_TAG_ATTRIBUTES)
 
 # Default size for a character cell rendered as SVG.
 CELL_WIDTH = 8
@@ -52,6 +66,13 @@ NAMESPACES = {
     'xlink': XLINK_NS,
 }
 
+# Parser for SVG templates: templates do not rely on xml:id lookups and must
+# not fetch network resources. Internal entities are still expanded since the
+# DOCTYPE declaring them is not part of the output, and blank text is kept
+# since it is significant in mixed content (e.g. between two tspan elements
+# of a custom template)
+_TEMPLATE_PARSER = etree.XMLParser(collect_ids=False, no_network=True)
+
 
 class TemplateError(Exception):
     pass
@@ -73,65 +94,68 @@ _CharacterCell.color.__doc__ = 'Color of the text'
 _CharacterCell.background_color.__doc__ = 'Background color of the cell'
 
 
+# Attributes of a CharacterCell that define the style of its text
+_TEXT_STYLE_ATTRIBUTES = ('color', 'bold', 'italics', 'underscore', 'strikethrough')
+_text_style = attrgetter(*_TEXT_STYLE_ATTRIBUTES)
+
+
 class CharacterCell(_CharacterCell):
+    __slots__ = ()
+
     @classmethod
     def from_pyte(cls, char):
-        """Create a CharacterCell from a pyte character"""
-        if char.fg == 'default':
-            text_color = 'foreground'
-        else:
-            if char.bold and not str(char.fg).startswith('bright'):
-                named_color = 'bright{}'.format(char.fg)
-            else:
-                named_color = char.fg
-
-            if named_color in NAMED_COLORS:
-                text_color = 'color{}'.format(NAMED_COLORS.index(named_color))
-            elif len(char.fg) == 6:
-                # HEXADECIMAL COLORS
-                # raise ValueError if char.fg is not an hexadecimal number
-                int(char.fg, 16)
-                text_color = '#{}'.format(char.fg)
-            else:
-                raise ValueError('Invalid foreground color: {}'.format(char.fg))
+        """Create a CharacterCell from a pyte character
+
+        Cells are immutable and screens are made of a small number of distinct
+        characters, so identical pyte characters share the same CharacterCell.
+        """
+        return _cell_from_pyte(char)
+
+
+@lru_cache(maxsize=4096)
+def _cell_from_pyte(char):
+    text_color, background_color = _cell_colors(char.fg, char.bg, char.bold,
+                                                char.reverse)
+    return CharacterCell(char.data, text_color, background_color,
+                         char.bold, char.italics, char.underscore,
+                         char.strikethrough)
 
-        if char.bg == 'default':
-            background_color = 'background'
-        elif char.bg in NAMED_COLORS:
-            background_color = 'color{}'.format(NAMED_COLORS.index(char.bg))
-        elif len(char.bg) == 6:
+
+@lru_cache(maxsize=4096)
+def _cell_colors(fg, bg, bold, reverse):
+    """Return text and background colors of a cell given pyte color attributes
+
+    Terminal sessions only use a handful of distinct color combinations, so
+    results are cached to avoid resolving them again for every character.
+    """
+    if fg == 'default':
+        text_color = 'foreground'
+    else:
+        text_color = _TEXT_COLOR_CLASSES.get((fg, bool(bold)))
+        if text_color is None:
+            if len(fg) != 6:
+                raise ValueError('Invalid foreground color: {}'.format(fg))
+            # HEXADECIMAL COLORS
+            # raise ValueError if fg is not an hexadecimal number
+            int(fg, 16)
+            text_color = '#{}'.format(fg)
+
+    if bg == 'default':
+        background_color = 'background'
+    else:
+        background_color = _NAMED_COLOR_CLASSES.get(bg)
+        if background_color is None:
+            if len(bg) != 6:
+                raise ValueError('Invalid background color')
             # Hexadecimal colors
-            # raise ValueError if char.bg is not an hexadecimal number
-            int(char.bg, 16)
-            background_color = '#{}'.format(char.bg)
-        else:
-            raise ValueError('Invalid background color')
-
-        if char.reverse:
-            text_color, background_color = background_color, text_color
-
-        return CharacterCell(char.data, text_color, background_color,
-                             char.bold, char.italics, char.underscore,
-                             char.strikethrough)
-
-
-class ConsecutiveWithSameAttributes:
-    """Callable to be used as a key for itertools.groupby to group together
-    consecutive elements of a list with the same attributes"""
-    def __init__(self, attributes):
-        self.group_index = None
-        self.last_index = None
-        self.attributes = attributes
-        self.last_key_attributes = None
-
-    def __call__(self, arg):
-        index, obj = arg
-        key_attributes = {name: getattr(obj, name) for name in self.attributes}
-        if self.last_index != index - 1 or self.last_key_attributes != key_attributes:
-            self.group_index = index
-        self.last_index = index
-        self.last_key_attributes = key_attributes
-        return self.group_index, key_attributes
+            # raise ValueError if bg is not an hexadecimal number
+            int(bg, 16)
+            background_color = '#{}'.format(bg)
+
+    if reverse:
+        text_color, background_color = background_color, text_color
+
+    return text_color, background_color
 
 
 def render_animation(frames, geometry, filename, template,
@@ -140,8 +164,7 @@ def render_animation(frames, geometry, filename, template,
     _, screen_height = geometry
     root = _render_animation(screen_height, frames, root, cell_width, cell_height)
 
-    with open(filename, 'wb') as output_file:
-        output_file.write(etree.tostring(root))
+    _write_svg(root, filename)
 
 
 def render_still_frames(frames, geometry, directory, template,
@@ -151,8 +174,18 @@ def render_still_frames(frames, geometry, directory, template,
     frame_generator = _render_still_frames(frames, root, cell_width, cell_height)
     for frame_count, frame_root in enumerate(frame_generator):
         filename = os.path.join(directory, 'termtosvg_{:05}.svg'.format(frame_count))
-        with open(filename, 'wb') as output_file:
-            output_file.write(etree.tostring(frame_root))
+        _write_svg(frame_root, filename)
+
+
+def _write_svg(root, filename):
+    """Serialize the SVG document to filename
+
+    The document is written incrementally to the file instead of being
+    serialized in memory first.
+    """
+    with open(filename, 'wb') as output_file:
+        with etree.xmlfile(output_file) as xml_file:
+            xml_file.write(root)
 
 
 def _render_preparation(geometry, template, cell_width, cell_height):
@@ -165,7 +198,7 @@ def _render_preparation(geometry, template, cell_width, cell_height):
 
     for child in svg_screen_tag.getchildren():
         svg_screen_tag.remove(child)
-    svg_screen_tag.append(BG_RECT_TAG)
+    etree.SubElement(svg_screen_tag, 'rect', _BG_RECT_TAG_ATTRIBUTES)
 
     return root
 
@@ -185,8 +218,7 @@ def _render_still_frames(frames, root, cell_width, cell_height):
         if svg_screen_tag is None:
             raise ValueError('Missing tag: <svg id="screen" ...>...</svg>')
         tree_defs = etree.SubElement(svg_screen_tag, 'defs')
-        for definition in frame_definitions.values():
-            tree_defs.append(definition)
+        tree_defs.extend(frame_definitions.values())
         svg_screen_tag.append(frame_group)
 
         _embed_css(frame_root)
@@ -199,7 +231,10 @@ def _render_animation(screen_height, frames, root, cell_width, cell_height):
     if svg_screen_tag is None:
         raise ValueError('Missing tag: <svg id="screen" ...>...</svg>')
 
-    screen_view = etree.Element('g', attrib={'id': 'screen_view'})
+    # The containers are created in place, frame groups and definitions are
+    # built detached and attached to them below
+    tree_defs = etree.SubElement(svg_screen_tag, 'defs')
+    screen_view = etree.SubElement(svg_screen_tag, 'g', attrib={'id': 'screen_view'})
 
     definitions = {}
     timings = {}
@@ -223,11 +258,7 @@ def _render_animation(screen_height, frames, root, cell_width, cell_height):
         timings[frame.time] = -offset
         definitions.update(frame_definitions)
 
-    tree_defs = etree.SubElement(svg_screen_tag, 'defs')
-    for definition in definitions.values():
-        tree_defs.append(definition)
-
-    svg_screen_tag.append(screen_view)
+    tree_defs.extend(definitions.values())
     _add_animation(root, timings, animation_duration)
     return root
 
@@ -267,44 +298,48 @@ def _render_timed_frame(offset, buffer, cell_height, cell_width, definitions):
     frame_group_tag = etree.Element('g')
 
     group_definitions = {}
-    for row_number in buffer:
-        if buffer[row_number]:
-            current_definitions = {**definitions, **group_definitions}
+    # Existing definitions and those created for this frame, copied once per
+    # frame instead of being merged again for every line
+    current_definitions = dict(definitions)
+    for row_number, row in buffer.items():
+        if row:
             tags, new_definitions = _render_line(offset,
                                                  row_number,
-                                                 buffer[row_number],
+                                                 row,
                                                  cell_height,
                                                  cell_width,
                                                  current_definitions)
-            for tag in tags:
-                frame_group_tag.append(tag)
+            frame_group_tag.extend(tags)
             group_definitions.update(new_definitions)
+            current_definitions.update(new_definitions)
 
     return frame_group_tag, group_definitions
 
 
 def _render_line(offset, row_number, row, cell_height, cell_width, definitions):
+    # Both renderers walk the cells of the line in column order: sort them once
+    cells = sorted(row.items(), key=itemgetter(0))
     tags = _render_line_bg_colors(screen_line=row,
                                   height=offset + row_number * cell_height,
                                   cell_height=cell_height,
-                                  cell_width=cell_width)
-
-    # Group text elements for the current line into text_group_tag
-    text_group_tag = etree.Element('g')
-    text_tags = _render_characters(row, cell_width)
-    for tag in text_tags:
-        text_group_tag.append(tag)
-
-    # Find or create a definition for text_group_tag
-    text_group_tag_str = etree.tostring(text_group_tag)
-    if text_group_tag_str in definitions:
-        group_id = definitions[text_group_tag_str].attrib['id']
+                                  cell_width=cell_width,
+                                  cells=cells)
+
+    # Find or create a definition grouping the text elements of the line. The
+    # text elements only depend on the position, content and style of the
+    # cells so they are only rendered for lines not seen before
+    text_key = tuple((column, cell.text, _text_style(cell))
+                     for column, cell in cells)
+    if text_key in definitions:
+        group_id = definitions[text_key].attrib['id']
         new_definitions = {}
     else:
+        text_group_tag = etree.Element('g')
+        text_group_tag.extend(_render_characters(row, cell_width, cells))
         group_id = 'g{}'.format(len(definitions) + 1)
         assert group_id not in definitions.values()
         text_group_tag.attrib['id'] = group_id
-        new_definitions = {text_group_tag_str: text_group_tag}
+        new_definitions = {text_key: text_group_tag}
 
     # Add a reference to the definition of text_group_tag with a 'use' tag
     use_attributes = {
@@ -332,80 +367,134 @@ def _make_rect_tag(column, length, height, cell_width, cell_height, background_c
     return rect_tag
 
 
-def _render_line_bg_colors(screen_line, height, cell_height, cell_width):
+def _render_line_bg_colors(screen_line, height, cell_height, cell_width,
+                           cells=None):
     """Return a list of 'rect' tags representing the background of 'screen_line'
 
     If consecutive cells have the same background color, a single 'rect' tag is
     returned for all these cells.
     If a cell background uses default_bg_color, no 'rect' will be generated for
     this cell since the default background is always displayed.
+    Tags are returned in ascending column order.
 
     :param screen_line: Mapping between column numbers and CharacterCells
     :param height: Vertical position of the line on the screen in pixels
     :param cell_height: Height of the a character cell in pixels
     :param cell_width: Width of a character cell in pixels
+    :param cells: Items of screen_line sorted by column (computed from
+    screen_line if missing)
     """
-    non_default_bg_cells = [(column, cell) for (column, cell)
-                            in sorted(screen_line.items())
-                            if cell.background_color != 'background']
-
-    key = ConsecutiveWithSameAttributes(['background_color'])
-    rect_tags = [
-        _make_rect_tag(
-            column,
-            wcswidth(''.join(t[1].text for t in group)),
-            height,
-            cell_width,
-            cell_height,
-            attributes['background_color']
-        ) for (column, attributes), group in groupby(non_default_bg_cells, key)]
+    if cells is None:
+        cells = sorted(screen_line.items(), key=itemgetter(0))
+
+    # Single pass over the line: a run of cells is extended as long as columns
+    # are contiguous and share the same non default background color
+    rect_tags = []
+    run_column = run_color = last_column = None
+    run_texts = []
+    for column, cell in cells:
+        color = cell.background_color
+        if color == 'background':
+            continue
+        if run_texts and (column != last_column + 1 or color != run_color):
+            rect_tags.append(_make_rect_tag(run_column, wcswidth(''.join(run_texts)),
+                                            height, cell_width, cell_height,
+                                            run_color))
+            run_texts = []
+        if not run_texts:
+            run_column, run_color = column, color
+        run_texts.append(cell.text)
+        last_column = column
+
+    if run_texts:
+        rect_tags.append(_make_rect_tag(run_column, wcswidth(''.join(run_texts)),
+                                        height, cell_width, cell_height,
+                                        run_color))
 
     return rect_tags
 
 
-def _make_text_tag(column, attributes, text, cell_width):
-    """Build SVG text element based on content and style attributes"""
+def _make_text_tag(column, style, text, cell_width):
+    """Build SVG text element based on content and style
+
+    :param style: Tuple of the character attributes listed in
+    _TEXT_STYLE_ATTRIBUTES
+    """
     text_tag_attributes = {
         'x': str(column * cell_width),
         'textLength': str(wcswidth(text) * cell_width),
     }
-    if attributes['bold']:
-        text_tag_attributes['font-weight'] = 'bold'
+    text_tag_attributes.update(_text_style_tag_attributes(*style))
+
+    text_tag = etree.Element('text', text_tag_attributes)
+    text_tag.text = text
+    return text_tag
 
-    if attributes['italics']:
-        text_tag_attributes['font-style'] = 'italic'
+
+@lru_cache(maxsize=1024)
+def _text_style_tag_attributes(color, bold, italics, underscore, strikethrough):
+    """Return the SVG attributes of a text element for the given style
+
+    Only a few styles are used in a session so results are cached. The
+    returned mapping must not be modified.
+    """
+    attributes = {}
+    if bold:
+        attributes['font-weight'] = 'bold'
+
+    if italics:
+        attributes['font-style'] = 'italic'
 
     decoration = ''
-    if attributes['underscore']:
+    if underscore:
         decoration = 'underline'
-    if attributes['strikethrough']:
+    if strikethrough:
         decoration += ' line-through'
     if decoration:
-        text_tag_attributes['text-decoration'] = decoration
+        attributes['text-decoration'] = decoration
 
-    if attributes['color'].startswith('#'):
-        text_tag_attributes['fill'] = attributes['color']
+    if color.startswith('#'):
+        attributes['fill'] = color
     else:
-        text_tag_attributes['class'] = attributes['color']
+        attributes['class'] = color
 
-    text_tag = etree.Element('text', text_tag_attributes)
-    text_tag.text = text
-    return text_tag
+    return attributes
 
 
-def _render_characters(screen_line, cell_width):
+def _render_characters(screen_line, cell_width, cells=None):
     """Return a list of 'text' elements representing the line of the screen
 
     Consecutive characters with the same styling attributes (text color, font
-    weight...) are grouped together in a single text element.
+    weight...) are grouped together in a single text element. Elements are
+    returned in ascending column order.
 
     :param screen_line: Mapping between column numbers and characters
     :param cell_width: Width of a character cell in pixels
+    :param cells: Items of screen_line sorted by column (computed from
+    screen_line if missing)
     """
-    line = sorted(screen_line.items())
-    key = ConsecutiveWithSameAttributes(['color', 'bold', 'italics', 'underscore', 'strikethrough'])
-    text_tags = [_make_text_tag(column, attributes, ''.join(c.text for _, c in group), cell_width)
-                 for (column, attributes), group in groupby(line, key)]
+    if cells is None:
+        cells = sorted(screen_line.items(), key=itemgetter(0))
+
+    # Single pass over the line: a run of characters is extended as long as
+    # columns are contiguous and share the same style
+    text_tags = []
+    run_column = run_style = last_column = None
+    run_texts = []
+    for column, cell in cells:
+        style = _text_style(cell)
+        if run_texts and (column != last_column + 1 or style != run_style):
+            text_tags.append(_make_text_tag(run_column, run_style,
+                                            ''.join(run_texts), cell_width))
+            run_texts = []
+        if not run_texts:
+            run_column, run_style = column, style
+        run_texts.append(cell.text)
+        last_column = column
+
+    if run_texts:
+        text_tags.append(_make_text_tag(run_column, run_style,
+                                        ''.join(run_texts), cell_width))
 
     return text_tags
 
@@ -439,7 +528,7 @@ def resize_template(template, geometry, cell_width, cell_height):
         return element
 
     try:
-        tree = etree.parse(io.BytesIO(template))
+        tree = etree.parse(io.BytesIO(template), _TEMPLATE_PARSER)
         root = tree.getroot()
     except etree.Error as exc:
         raise TemplateError('Invalid template') from exc
@@ -499,6 +588,11 @@ def validate_template(name, templates):
         raise TemplateError('Invalid template') from exc
 
 
+def _format_decimal(number):
+    """Format number with 3 decimal places at most, without trailing zeros"""
+    return '{:.3f}'.format(number).rstrip('0').rstrip('.')
+
+
 def _embed_css(root, timings=None, animation_duration=None):
     try:
         style = root.find('.//{{{ns}}}defs/{{{ns}}}style[@id="generated-style"]'
@@ -530,11 +624,11 @@ def _embed_css(root, timings=None, animation_duration=None):
 
         transforms = []
         last_offset = None
-        transform_format = "{time:.3f}%{{transform:translateY({offset}px)}}"
+        transform_format = "{time}%{{transform:translateY({offset}px)}}"
         for time, offset in sorted(timings.items()):
             transforms.append(
                 transform_format.format(
-                    time=100.0 * time/animation_duration,
+                    time=_format_decimal(100.0 * time/animation_duration),
                     offset=offset
                 )
             )
@@ -616,7 +710,7 @@ def _embed_waapi(root, timings=None, animation_duration=None):
 
 
         transform_no_offset = "{{transform: 'translate3D(0, {y_pos}px, 0)', easing: 'steps(1, end)'}}"
-        transform_with_offset = "{{transform: 'translate3D(0, {y_pos}px, 0)', easing: 'steps(1, end)', offset: {offset:.3f}}}"
+        transform_with_offset = "{{transform: 'translate3D(0, {y_pos}px, 0)', easing: 'steps(1, end)', offset: {offset}}}"
 
         transforms = []
         last_pos = None
@@ -626,7 +720,8 @@ def _embed_waapi(root, timings=None, animation_duration=None):
             else:
                 transforms.append(
                     transform_with_offset
-                    .format(offset=time / animation_duration, y_pos=y_pos)
+                    .format(offset=_format_decimal(time / animation_duration),
+                            y_pos=y_pos)
                 )
             last_pos = y_pos
 
@@ -653,7 +748,12 @@ def _embed_waapi(root, timings=None, animation_duration=None):
 
 
 def validate_svg(svg_file):
-    """Validate an SVG file against SVG 1.1 Document Type Definition"""
+    """Validate an SVG file against SVG 1.1 Document Type Definition
+
+    This function is not used while rendering: the output is built with lxml
+    and is well-formed by construction, so reparsing it would only slow down
+    rendering of large animations.
+    """
     package = __name__.split('.')[0]
     dtd_bytes = pkgutil.get_data(package, '/data/svg11-flat-20110816.dtd')
     with io.BytesIO(dtd_bytes) as bstream:
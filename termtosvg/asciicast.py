@@ -19,6 +19,9 @@ class AsciiCastError(Exception):
 
 class AsciiCastV2Record(abc.ABC):
     """Generic Asciicast v2 record format"""
+    # Records are immutable named tuples: do not give each instance a __dict__
+    __slots__ = ()
+
     @abc.abstractmethod
     def to_json_line(self):
         raise NotImplementedError
@@ -31,9 +34,9 @@ class AsciiCastV2Record(abc.ABC):
         except json.JSONDecodeError as exc:
             raise AsciiCastError from exc
         if isinstance(json_dict, dict):
-            return AsciiCastV2Header.from_json_line(line)
+            return AsciiCastV2Header.from_json(json_dict)
         if isinstance(json_dict, list):
-            return AsciiCastV2Event.from_json_line(line)
+            return AsciiCastV2Event.from_json(json_dict)
         truncated_line = line if len(line) < 20 else '{}...'.format(line[:20])
         raise AsciiCastError('Unknown record type: "{}"'.format(truncated_line))
 
@@ -104,14 +107,16 @@ class AsciiCastV2Theme(_AsciiCastV2Theme):
     bg: default background colors
     palette: colon separated list of 8 or 16 terminal colors
     """
+    __slots__ = ()
+
     def __new__(cls, fg, bg, palette):
         if cls.is_color(fg):
             if cls.is_color(bg):
                 colors = palette.split(':')
-                if len(colors) >= 16 and all([cls.is_color(c) for c in colors[:16]]):
+                if len(colors) >= 16 and all(map(cls.is_color, colors[:16])):
                     self = super().__new__(cls, fg, bg, palette)
                     return self
-                if len(colors) >= 8 and all([cls.is_color(c) for c in colors[:8]]):
+                if len(colors) >= 8 and all(map(cls.is_color, colors[:8])):
                     new_palette = ':'.join(colors[:8])
                     self = super().__new__(cls, fg, bg, new_palette)
                     return self
@@ -142,6 +147,8 @@ class AsciiCastV2Header(AsciiCastV2Record, _AsciiCastV2Header):
     height: Initial number of lines of the terminal
     theme: Color theme of the terminal
     """
+    __slots__ = ()
+
     types = {
         'version': int,
         'width': int,
@@ -152,8 +159,7 @@ class AsciiCastV2Header(AsciiCastV2Record, _AsciiCastV2Header):
 
     def __new__(cls, version, width, height, theme, idle_time_limit=None):
         self = super(AsciiCastV2Header, cls).__new__(cls, version, width, height, theme, idle_time_limit)
-        for attr_name in cls._fields:
-            attr = self.__getattribute__(attr_name)
+        for attr_name, attr in zip(cls._fields, self):
             if not isinstance(attr, cls.types[attr_name]):
                 raise AsciiCastError('Invalid type for attribute {}: {} (expected one of {})'
                                      .format(attr_name, type(attr), cls.types[attr_name]))
@@ -175,7 +181,11 @@ class AsciiCastV2Header(AsciiCastV2Record, _AsciiCastV2Header):
 
     @classmethod
     def from_json_line(cls, line):
-        attributes = json.loads(line)
+        return cls.from_json(json.loads(line))
+
+    @classmethod
+    def from_json(cls, attributes):
+        """Build header from the decoded JSON object"""
         filtered_attributes = {attr: attributes.get(attr) for attr in AsciiCastV2Header._fields}
         if filtered_attributes['theme'] is not None:
             filtered_attributes['theme'] = AsciiCastV2Theme(**filtered_attributes['theme'])
@@ -196,6 +206,8 @@ class AsciiCastV2Event(AsciiCastV2Record, _AsciiCastV2Event):
     event_data: Data captured during the recording
     duration: Duration of the event in seconds (non standard field)
     """
+    __slots__ = ()
+
     types = {
         'time': (int, float),
         'event_type': (str,),
@@ -205,8 +217,7 @@ class AsciiCastV2Event(AsciiCastV2Record, _AsciiCastV2Event):
 
     def __new__(cls, *args, **kwargs):
         self = super(AsciiCastV2Event, cls).__new__(cls, *args, **kwargs)
-        for attr_name in AsciiCastV2Event._fields:
-            attr = self.__getattribute__(attr_name)
+        for attr_name, attr in zip(AsciiCastV2Event._fields, self):
             if not isinstance(attr, cls.types[attr_name]):
                 raise AsciiCastError('Invalid type for attribute {}: {} (expected one of {})'
                                      .format(attr_name, type(attr), cls.types[attr_name]))
@@ -219,8 +230,17 @@ class AsciiCastV2Event(AsciiCastV2Record, _AsciiCastV2Event):
     @classmethod
     def from_json_line(cls, line):
         try:
-            time, event_type, event_data = json.loads(line)
-        except (json.JSONDecodeError, ValueError) as exc:
+            attributes = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise AsciiCastError from exc
+        return cls.from_json(attributes)
+
+    @classmethod
+    def from_json(cls, attributes):
+        """Build event from the decoded JSON array"""
+        try:
+            time, event_type, event_data = attributes
+        except ValueError as exc:
             raise AsciiCastError from exc
 
         event = cls(time, event_type, event_data, None)
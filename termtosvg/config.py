@@ -1,4 +1,5 @@
 import pkgutil
+from functools import lru_cache
 
 PKG_TEMPLATE_PATH = 'data/templates'
 
@@ -35,6 +36,13 @@ def validate_geometry(screen_geometry):
 
 def default_templates():
     """Return mapping between the name of a template and the SVG template itself"""
+    # Return a copy so that callers can't alter the cached templates
+    return dict(_read_default_templates())
+
+
+@lru_cache(maxsize=1)
+def _read_default_templates():
+    """Read default templates from the package data once per process"""
     templates = {}
     for template_name in DEFAULT_TEMPLATES_NAMES:
         pkg_template_path = '{}/{}'.format(PKG_TEMPLATE_PATH, template_name)
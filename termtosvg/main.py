@@ -6,7 +6,6 @@ import os
 import shlex
 import sys
 import tempfile
-import pkg_resources
 
 import termtosvg.config
 import termtosvg.anim
@@ -35,6 +34,30 @@ def integral_duration_validation(duration):
     raise ValueError('duration must be an integer greater than 0')
 
 
+def _installed_version():
+    """Return the version of the installed termtosvg distribution"""
+    # pkg_resources is slow to import so only do it when the version is needed
+    import pkg_resources
+    return pkg_resources.require('termtosvg')[0].version
+
+
+class _VersionAction(argparse.Action):
+    """Print the version of termtosvg and exit
+
+    Contrary to argparse's 'version' action, the version is only looked up
+    when the option is used.
+    """
+    def __init__(self, option_strings, dest=argparse.SUPPRESS,
+                 default=argparse.SUPPRESS,
+                 help="show program's version number and exit"):
+        super().__init__(option_strings=option_strings, dest=dest,
+                         default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print('{} {}'.format(parser.prog, _installed_version()))
+        parser.exit()
+
+
 def parse(args, templates, default_template, default_geometry, default_min_dur,
           default_max_dur, default_cmd, default_loop_delay):
     """Parse command line arguments
@@ -58,15 +81,8 @@ def parse(args, templates, default_template, default_geometry, default_min_dur,
     """
     command_parser = argparse.ArgumentParser(add_help=False)
 
-    # https://stackoverflow.com/questions/15405636/pythons-argparse-to-show-programs-version-with-prog-and-version-string-formatt
-    # https://stackoverflow.com/questions/2058802/how-can-i-get-the-version-defined-in-setup-py-setuptools-in-my-package
-    command_parser.add_argument(
-        '-v', '--version',
-        action='version',
-        version='%(prog)s {}'.format(
-            pkg_resources.require('termtosvg')[0].version
-        )
-    )
+    # The version is only looked up when requested, see _VersionAction
+    command_parser.add_argument('-v', '--version', action=_VersionAction)
 
     command_parser.add_argument(
         '-c', '--command',
@@ -299,8 +315,9 @@ def main(args=None, input_fileno=None, output_fileno=None):
 
     if command == 'record':
         if args.output_path is None:
-            _, cast_filename = tempfile.mkstemp(prefix='termtosvg_',
-                                                suffix='.cast')
+            fd, cast_filename = tempfile.mkstemp(prefix='termtosvg_',
+                                                 suffix='.cast')
+            os.close(fd)
         else:
             cast_filename = args.output_path
         process_args = shlex.split(args.command)
@@ -311,8 +328,9 @@ def main(args=None, input_fileno=None, output_fileno=None):
             if args.still_frames:
                 output_path = tempfile.mkdtemp(prefix='termtosvg_')
             else:
-                _, output_path = tempfile.mkstemp(prefix='termtosvg_',
-                                                  suffix='.svg')
+                fd, output_path = tempfile.mkstemp(prefix='termtosvg_',
+                                                   suffix='.svg')
+                os.close(fd)
         else:
             output_path = args.output_path
             if args.still_frames:
@@ -330,8 +348,9 @@ def main(args=None, input_fileno=None, output_fileno=None):
             if args.still_frames:
                 output_path = tempfile.mkdtemp(prefix='termtosvg_')
             else:
-                _, output_path = tempfile.mkstemp(prefix='termtosvg_',
-                                                  suffix='.svg')
+                fd, output_path = tempfile.mkstemp(prefix='termtosvg_',
+                                                   suffix='.svg')
+                os.close(fd)
         else:
             output_path = args.output_path
             if args.still_frames:
@@ -12,16 +12,15 @@ terminal unusable.
 """
 
 import codecs
-import datetime
 import fcntl
 import os
 import pty
-import select
+import selectors
 import struct
 import termios
+import time
 import tty
 from collections import defaultdict, namedtuple
-from typing import Iterator
 
 import pyte
 import pyte.screens
@@ -105,8 +104,8 @@ def _record(process_args, columns, lines, input_fileno, output_fileno):
     except tty.error:
         pass
 
-    for data, time in _capture_output(input_fileno, output_fileno, master_fd):
-        yield data, time
+    for data, data_time in _capture_output(input_fileno, output_fileno, master_fd):
+        yield data, data_time
 
     os.close(master_fd)
 
@@ -114,7 +113,7 @@ def _record(process_args, columns, lines, input_fileno, output_fileno):
     return child_exit_status
 
 
-def _capture_output(input_fileno, output_fileno, master_fd, buffer_size=1024):
+def _capture_output(input_fileno, output_fileno, master_fd, buffer_size=65536):
     """Send data from input_fileno to master_fd and send data from master_fd to
     output_fileno and to the caller
 
@@ -124,32 +123,39 @@ def _capture_output(input_fileno, output_fileno, master_fd, buffer_size=1024):
 
     See https://github.com/python/cpython/blob/master/Lib/pty.py
     """
-    rlist = [input_fileno, master_fd]
-    xlist = [input_fileno, output_fileno, master_fd]
-
-    xfds = []
-    while not xfds:
-        rfds, _, xfds = select.select(rlist, [], xlist)
-        for fd in rfds:
-            try:
-                data = os.read(fd, buffer_size)
-            except OSError:
-                xfds.append(fd)
-                continue
-
-            if not data:
-                xfds.append(fd)
-                continue
-
-            if fd == input_fileno:
-                write_fileno = master_fd
-            else:
-                write_fileno = output_fileno
-                yield data, datetime.datetime.now()
-
-            while data:
-                n = os.write(write_fileno, data)
-                data = data[n:]
+    # Each file descriptor is registered once with the destination of the data
+    # read from it. Unlike epoll, select accepts regular files and /dev/null
+    # as input, and unlike poll on macOS, it supports ttys
+    with selectors.SelectSelector() as selector:
+        selector.register(input_fileno, selectors.EVENT_READ, master_fd)
+        selector.register(master_fd, selectors.EVENT_READ, output_fileno)
+
+        closed = False
+        while not closed:
+            for key, _ in selector.select():
+                try:
+                    data = os.read(key.fd, buffer_size)
+                except OSError:
+                    closed = True
+                    continue
+
+                if not data:
+                    if key.fd == input_fileno:
+                        # Redirected input is exhausted but the process may
+                        # still be producing output (pty.spawn does the same)
+                        selector.unregister(input_fileno)
+                    else:
+                        closed = True
+                    continue
+
+                if key.fd == master_fd:
+                    yield data, time.monotonic()
+
+                # Slicing a memoryview does not copy the data left to write
+                remaining = memoryview(data)
+                while remaining:
+                    n = os.write(key.data, remaining)
+                    remaining = remaining[n:]
 
 
 def _group_by_time(event_records, min_rec_duration, max_rec_duration, last_rec_duration):
@@ -171,7 +177,7 @@ def _group_by_time(event_records, min_rec_duration, max_rec_duration, last_rec_d
     :return: Sequence of records with duration
     """
     # TODO: itertools.accumulate?
-    current_string = ''
+    current_strings = []
     current_time = 0
     dropped_time = 0
 
@@ -194,17 +200,17 @@ def _group_by_time(event_records, min_rec_duration, max_rec_duration, last_rec_d
                     time_between_events = max_rec_duration
             accumulator_event = AsciiCastV2Event(time=current_time,
                                                  event_type='o',
-                                                 event_data=current_string,
+                                                 event_data=''.join(current_strings),
                                                  duration=time_between_events)
             yield accumulator_event
-            current_string = ''
+            current_strings = []
             current_time += time_between_events
 
-        current_string += event_record.event_data
+        current_strings.append(event_record.event_data)
 
     accumulator_event = AsciiCastV2Event(time=current_time,
                                          event_type='o',
-                                         event_data=current_string,
+                                         event_data=''.join(current_strings),
                                          duration=last_rec_duration / 1000)
     yield accumulator_event
 
@@ -237,11 +243,11 @@ def record(process_args, columns, lines, input_fileno, output_fileno):
     # TODO: why start != 0?
     start = None
     utf8_decoder = codecs.getincrementaldecoder('utf-8')('replace')
-    for data, time in _record(process_args, columns, lines, input_fileno, output_fileno):
+    for data, data_time in _record(process_args, columns, lines, input_fileno, output_fileno):
         if start is None:
-            start = time
+            start = data_time
 
-        yield AsciiCastV2Event(time=(time - start).total_seconds(),
+        yield AsciiCastV2Event(time=data_time - start,
                                event_type='o',
                                event_data=utf8_decoder.decode(data),
                                duration=None)
@@ -267,8 +273,8 @@ def timed_frames(records, min_frame_dur=1, max_frame_dur=None, last_frame_dur=10
     :param last_frame_dur: Duration of the last frame of the animation
     (integer)
     """
-    if not isinstance(records, Iterator):
-        records = iter(records)
+    # iter() returns iterators unchanged
+    records = iter(records)
 
     header = next(records)
     assert isinstance(header, AsciiCastV2Header)
@@ -282,26 +288,48 @@ def timed_frames(records, min_frame_dur=1, max_frame_dur=None, last_frame_dur=10
         timed_records = _group_by_time(records, min_frame_dur, max_frame_dur,
                                        last_frame_dur)
 
+        feed = stream.feed
+        rows = {}
         for record_ in timed_records:
             assert isinstance(record_, AsciiCastV2Event)
             for char in record_.event_data:
-                stream.feed(char)
+                feed(char)
             yield TimedFrame(int(1000 * record_.time),
                              int(1000 * record_.duration),
-                             _screen_buffer(screen))
+                             _screen_buffer(screen, rows))
 
     return (header.width, header.height), generator()
 
 
-def _screen_buffer(screen):
+def _screen_buffer(screen, rows=None):
+    """Return the content of the screen as a mapping between row numbers and
+    lines of CharacterCells
+
+    :param screen: pyte Screen
+    :param rows: Rows computed for the previous frame of the same screen,
+    updated in place. If provided, only the rows pyte marked as dirty since the
+    last call are converted again, and screen.dirty is cleared. Otherwise the
+    whole screen is converted and screen.dirty is left untouched.
+    """
     assert isinstance(screen, pyte.Screen)
 
-    buffer = defaultdict(dict)
-    for row in range(screen.lines):
-        buffer[row] = {
-            column: anim.CharacterCell.from_pyte(screen.buffer[row][column])
-            for column in screen.buffer[row]
-        }
+    track_dirty_rows = rows is not None
+    if not track_dirty_rows:
+        rows = {}
+    dirty_rows = screen.dirty if rows else range(screen.lines)
+
+    from_pyte = anim.CharacterCell.from_pyte
+    for row in dirty_rows:
+        if row < screen.lines:
+            line = screen.buffer[row]
+            rows[row] = {
+                column: from_pyte(char) for column, char in line.items()
+            }
+    if track_dirty_rows:
+        screen.dirty.clear()
+
+    # Rows are shared between frames and must not be modified afterwards
+    buffer = defaultdict(dict, rows)
 
     if not screen.cursor.hidden:
         row, column = screen.cursor.y, screen.cursor.x
@@ -314,6 +342,7 @@ def _screen_buffer(screen):
                                         fg=screen.cursor.attrs.fg,
                                         bg=screen.cursor.attrs.bg,
                                         reverse=True)
+        buffer[row] = dict(buffer[row])
         buffer[row][column] = anim.CharacterCell.from_pyte(cursor_char)
     return buffer
 
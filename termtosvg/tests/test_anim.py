@@ -3,7 +3,6 @@ import itertools
 import pkgutil
 import tempfile
 import unittest
-from collections import namedtuple
 
 import pyte.screens
 from lxml import etree
@@ -85,10 +84,7 @@ class TestAnim(unittest.TestCase):
                                                  cell_height=1,
                                                  cell_width=cell_width)
 
-        def key(r):
-            return r.attrib['x']
-
-        rect_0, rect_3, rect_4, rect_6, rect_8, rect_9, rect_11 = sorted(rectangles, key=key)
+        rect_0, rect_3, rect_4, rect_6, rect_8, rect_9, rect_11 = rectangles
 
         self.assertEqual(rect_0.attrib['x'], '0')
         self.assertEqual(rect_0.attrib['width'], '16')
@@ -142,33 +138,6 @@ class TestAnim(unittest.TestCase):
             self.assertIn('underline', texts['L'].attrib['text-decoration'].split())
             self.assertIn('line-through', texts['L'].attrib['text-decoration'].split())
 
-    def test_ConsecutiveWithSameAttributes(self):
-        testClass = namedtuple('testClass', ['field1', 'field2'])
-        test_cases = [
-            (0, testClass('a', 'b')),
-            (2, testClass('a', 'b')),
-            (3, testClass('a', 'b')),
-            (4, testClass('b', 'b')),
-            (5, testClass('b', 'a')),
-            (10, testClass('c', 'd')),
-            (11, testClass('c', 'd')),
-        ]
-
-        expected_results = [
-            (0, {'field1': 'a', 'field2': 'b'}),
-            (2, {'field1': 'a', 'field2': 'b'}),
-            (2, {'field1': 'a', 'field2': 'b'}),
-            (4, {'field1': 'b', 'field2': 'b'}),
-            (5, {'field1': 'b', 'field2': 'a'}),
-            (10, {'field1': 'c', 'field2': 'd'}),
-            (10, {'field1': 'c', 'field2': 'd'}),
-        ]
-
-        key = anim.ConsecutiveWithSameAttributes(['field1', 'field2'])
-        for case, result in zip(test_cases, expected_results):
-            with self.subTest(case=case):
-                self.assertEqual(key(case), result)
-
     def test__render_timed_frame(self):
         frames = [
             term.TimedFrame(1, 1, {
@@ -228,6 +197,27 @@ class TestAnim(unittest.TestCase):
         with open(filename) as f:
             anim.validate_svg(f)
 
+    def test__render_preparation(self):
+        # Each call must create its own background rectangle instead of
+        # moving a shared element from one tree to another
+        roots = [anim._render_preparation((80, 24), TEMPLATE, 8, 17)
+                 for _ in range(2)]
+        for count, root in enumerate(roots):
+            with self.subTest(case='Root #{}'.format(count)):
+                rects = root.findall('.//{{{ns}}}svg[@id="screen"]/rect[@class="background"]'
+                                     .format(ns=anim.SVG_NS))
+                self.assertEqual(len(rects), 1)
+
+    def test_resize_template_entities(self):
+        # Internal entities of custom templates must be expanded since the
+        # DOCTYPE declaring them is dropped from the output
+        template = (b'<!DOCTYPE svg [<!ENTITY title "My terminal">]>' +
+                    TEMPLATE.replace(b'<defs>', b'<desc>&title;</desc><defs>', 1))
+        root = anim.resize_template(template, (80, 24), 8, 17)
+        desc = root.find('{{{}}}desc'.format(anim.SVG_NS))
+        self.assertEqual(desc.text, 'My terminal')
+        etree.fromstring(etree.tostring(root))
+
     def test__render_still_frames(self):
         def line(s):
             return dict(enumerate([anim.CharacterCell(c) for c in s]))
@@ -287,6 +277,18 @@ class TestAnim(unittest.TestCase):
                 anim._embed_css(root, **args)
                 assert b'{{' not in etree.tostring(root)
 
+    def test__format_decimal(self):
+        test_cases = [
+            (0, '0'),
+            (100, '100'),
+            (12.5, '12.5'),
+            (33.33333, '33.333'),
+            (0.0004, '0'),
+        ]
+        for number, expected in test_cases:
+            with self.subTest(case=number):
+                self.assertEqual(anim._format_decimal(number), expected)
+
     def test_validate_svg(self):
         failure_test_cases = [
             '',
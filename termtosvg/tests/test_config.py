@@ -6,3 +6,9 @@ import termtosvg.config as config
 class TestConf(unittest.TestCase):
     def test_default_templates(self):
         templates = config.default_templates()
+        self.assertIn('powershell', templates)
+
+        # Modifying the returned mapping must not alter later results
+        templates.clear()
+        self.assertEqual(config.default_templates().keys(),
+                         set(name[:-len('.svg')] for name in config.DEFAULT_TEMPLATES_NAMES))
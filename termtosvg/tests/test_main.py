@@ -1,13 +1,12 @@
 import os
 import shutil
 import tempfile
-import time
 import unittest
 
 import termtosvg.main
 import termtosvg.config
 
-SHELL_INPUT = [
+SHELL_COMMANDS = [
     'echo $SHELL && sleep 0.1;\r\n',
     'date && sleep 0.1;\r\n',
     'uname && sleep 0.1;\r\n',
@@ -26,38 +25,41 @@ SHELL_INPUT = [
     'exit;\r\n'
 ]
 
+# Input of the shell, encoded once for all test cases
+SHELL_INPUT = ''.join(SHELL_COMMANDS).encode('utf-8')
+
 
 class TestMain(unittest.TestCase):
-    test_cases = [
-        [],
-        ['-c', 'sh'],
-        ['--screen-geometry', '82x19'],
-        ['-D', '1234'],
-        ['--loop-delay', '1234'],
-        ['-g', '82x19'],
-        ['--template', 'plain'],
-        ['-t', 'plain'],
-        ['-s'],
-        ['--still-frames'],
-        ['--screen-geometry', '82x19', '--template', 'plain'],
-        ['output_path', '-g', '82x19', '-t', 'plain', '-c', 'date', '-s'],
-        ['--screen-geometry', '82x19', '--template', 'plain', '-s', 'output_path'],
-        ['-g', '82x19', '-t', 'plain'],
-        ['-m', '42', '-M', '100'],
-        ['--min-frame-duration', '42ms', '--max-frame-duration', '100'],
-        ['record'],
-        ['record', '-c', 'ls'],
-        ['record', 'output_path'],
-        ['record', 'output_path', '--screen-geometry', '82x19'],
-        ['record', '--screen-geometry', '82x19'],
-        ['render', 'input_filename'],
-        ['render', 'input_filename'],
-        ['render', 'input_filename', '--template', 'plain'],
-        ['render', 'input_filename', 'output_path'],
-        ['render', 'input_filename', 'output_path', '--template', 'plain'],
-        ['render', 'input_filename', 'output_path', '-t', 'plain', '-m', '42', '-M', '100'],
-        ['render', 'input_filename', 'output_path', '-t', 'plain', '-m', '42', '-s', '-M', '100'],
-    ]
+    test_cases = (
+        (),
+        ('-c', 'sh'),
+        ('--screen-geometry', '82x19'),
+        ('-D', '1234'),
+        ('--loop-delay', '1234'),
+        ('-g', '82x19'),
+        ('--template', 'plain'),
+        ('-t', 'plain'),
+        ('-s',),
+        ('--still-frames',),
+        ('--screen-geometry', '82x19', '--template', 'plain'),
+        ('output_path', '-g', '82x19', '-t', 'plain', '-c', 'date', '-s'),
+        ('--screen-geometry', '82x19', '--template', 'plain', '-s', 'output_path'),
+        ('-g', '82x19', '-t', 'plain'),
+        ('-m', '42', '-M', '100'),
+        ('--min-frame-duration', '42ms', '--max-frame-duration', '100'),
+        ('record',),
+        ('record', '-c', 'ls'),
+        ('record', 'output_path'),
+        ('record', 'output_path', '--screen-geometry', '82x19'),
+        ('record', '--screen-geometry', '82x19'),
+        ('render', 'input_filename'),
+        ('render', 'input_filename'),
+        ('render', 'input_filename', '--template', 'plain'),
+        ('render', 'input_filename', 'output_path'),
+        ('render', 'input_filename', 'output_path', '--template', 'plain'),
+        ('render', 'input_filename', 'output_path', '-t', 'plain', '-m', '42', '-M', '100'),
+        ('render', 'input_filename', 'output_path', '-t', 'plain', '-m', '42', '-s', '-M', '100'),
+    )
 
     def test_parse(self):
         for args in self.test_cases:
@@ -82,9 +84,7 @@ class TestMain(unittest.TestCase):
         pid = os.fork()
         if pid == 0:
             # Child process
-            for line in process_input:
-                os.write(fd_in_write, line.encode('utf-8'))
-                time.sleep(0.060)
+            os.write(fd_in_write, process_input)
             os._exit(0)
 
         termtosvg.main.main(args, fd_in_read, fd_out_write)
@@ -94,8 +94,10 @@ class TestMain(unittest.TestCase):
             os.close(fd)
 
     def test_main(self):
-        _, cast_filename = tempfile.mkstemp(prefix='termtosvg_', suffix='.cast')
-        svg_filename = cast_filename[:-5] + '.svg'
+        temp_dir = tempfile.TemporaryDirectory(prefix='termtosvg_')
+        self.addCleanup(temp_dir.cleanup)
+        cast_filename = os.path.join(temp_dir.name, 'recording.cast')
+        svg_filename = os.path.join(temp_dir.name, 'animation.svg')
 
         with self.subTest(case='record (no filename)'):
             args = ['termtosvg', 'record']
@@ -111,42 +113,43 @@ class TestMain(unittest.TestCase):
 
         with self.subTest(case='record (with command)'):
             args = ['termtosvg', 'record', '-c', 'date']
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='render (no output filename)'):
             args = ['termtosvg', 'render', cast_filename]
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='render (with output filename)'):
             args = ['termtosvg', 'render', cast_filename, svg_filename]
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='render (with delay)'):
             args = ['termtosvg', 'render', cast_filename, '-D', '1234']
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='render (with template)'):
             args = ['termtosvg', 'render', cast_filename, '--template', 'window_frame']
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='render (still frames)'):
             args = ['termtosvg', 'render', cast_filename, '--still-frames']
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='render (still frames with output directory)'):
             # Existing directory
-            output_path = tempfile.mkdtemp(prefix='termtosvg')
+            output_path = os.path.join(temp_dir.name, 'frames')
+            os.mkdir(output_path)
             args = ['termtosvg', 'render', cast_filename, output_path, '-s']
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
             # Non existing directory
             shutil.rmtree(output_path)
             args = ['termtosvg', 'render', cast_filename, output_path, '-s']
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='record and render custom command'):
             args = ['termtosvg', '--command', 'ls']
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
         with self.subTest(case='record and render on the fly (fallback theme)'):
             args = ['termtosvg', '--screen-geometry', '82x19']
@@ -179,12 +182,12 @@ class TestMain(unittest.TestCase):
         ])
 
         with self.subTest(case='render v1 cast file'):
-            _, cast_filename_v1 = tempfile.mkstemp(prefix='termtosvg_', suffix='.cast')
+            cast_filename_v1 = os.path.join(temp_dir.name, 'recording_v1.cast')
             with open(cast_filename_v1, 'w') as cast_file:
                 cast_file.write(cast_v1_data)
 
             args = ['termtosvg', 'render', cast_filename_v1, svg_filename]
-            TestMain.run_main(args, [])
+            TestMain.run_main(args, b'')
 
     def test_integral_duration(self):
         test_cases = [
@@ -1,7 +1,9 @@
 import itertools
 import os
+import tempfile
 import time
 import unittest
+from collections import deque
 from unittest.mock import MagicMock, patch
 
 import pyte
@@ -48,8 +50,9 @@ class TestTerm(unittest.TestCase):
 
         # Parent process
         with term.TerminalMode(fd_in_read):
-            for _ in term._record(['sh'], columns, lines, fd_in_read, fd_out_write):
-                pass
+            # Exhaust the generator without keeping any record
+            deque(term._record(['sh'], columns, lines, fd_in_read, fd_out_write),
+                  maxlen=0)
 
         os.waitpid(pid, 0)
         for fd in fd_in_read, fd_in_write, fd_out_read, fd_out_write:
@@ -73,13 +76,28 @@ class TestTerm(unittest.TestCase):
 
         # Parent process
         with term.TerminalMode(fd_in_read):
-            for _ in term.record(['sh'], columns, lines, fd_in_read, fd_out_write):
-                pass
+            # Exhaust the generator without keeping any record
+            deque(term.record(['sh'], columns, lines, fd_in_read, fd_out_write),
+                  maxlen=0)
 
         os.waitpid(pid, 0)
         for fd in fd_in_read, fd_in_write, fd_out_read, fd_out_write:
             os.close(fd)
 
+    def test_record_regular_file_input(self):
+        # Regular files can't be registered with every selector (e.g. epoll)
+        with tempfile.TemporaryFile() as input_file:
+            input_file.write(''.join(commands).encode('utf-8'))
+            input_file.seek(0)
+            fd_out_read, fd_out_write = os.pipe()
+            header, *events = term.record(['sh'], 80, 24, input_file.fileno(),
+                                          fd_out_write)
+
+        self.assertEqual((header.width, header.height), (80, 24))
+        self.assertTrue(any(event.event_type == 'o' for event in events))
+        for fd in fd_out_read, fd_out_write:
+            os.close(fd)
+
     def test__buffer_simple_events(self):
         escape_sequences = ['{}\r\n'.format(i) for i in range(5)]
 
@@ -133,6 +151,35 @@ class TestTerm(unittest.TestCase):
                         if buffer[row][column].text == ' ':
                             self.assertEqual((column, row), cursor_pos)
 
+    def test__buffer_dirty_rows(self):
+        """Ensure buffers computed from dirty rows only match full buffers"""
+        escape_sequences = [
+            'a\r\nb',
+            '\u001b[1;31mc\u001b[0m',
+            '\u001b[2;1H\u001b[K',
+            '\u001b[1L',
+            '\r\n' * 30,
+            '\u001b[2J\u001b[?25l',
+        ]
+
+        screen = pyte.Screen(80, 24)
+        stream = pyte.Stream(screen)
+        rows = {}
+        for count, escape_sequence in enumerate(escape_sequences):
+            with self.subTest(case='Dirty rows (record #{})'.format(count)):
+                stream.feed(escape_sequence)
+                previous_rows = dict(rows)
+                dirty_rows = set(screen.dirty)
+                full_buffer = term._screen_buffer(screen)
+                # Dirty rows are only consumed when the caller tracks them
+                self.assertEqual(set(screen.dirty), dirty_rows)
+                buffer = term._screen_buffer(screen, rows)
+                self.assertEqual(buffer, full_buffer)
+                self.assertEqual(screen.dirty, set())
+                # Rows left untouched by pyte are reused as is
+                for row in previous_rows.keys() - dirty_rows:
+                    self.assertIs(rows[row], previous_rows[row])
+
     def test_timed_frames_simple_events(self):
         records = [AsciiCastV2Header(version=2, width=80, height=24, theme=THEME)] + \
                   [AsciiCastV2Event(time=i,